@@ -1,22 +1,27 @@
 """
 ESPHomeCLI AddOn - Web API for ESPHome CLI.
 Async job-based: validate, compile, upload, run, clean.
-Pasted YAML only (no storage); temp files under DATA_DIR.
+Pasted YAML only (no storage); temp YAML in tmpfs, build output under DATA_DIR.
 """
 import asyncio
+import contextlib
 import json
 import logging
 import os
-import subprocess
-import threading
-import uuid
+import re
+import signal
+from collections import deque
 from pathlib import Path
+from secrets import token_hex
+from time import monotonic
 from typing import Any, Optional
 
-from starlette.exceptions import NotFound
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
+import httpx
+import orjson
 from fastapi import FastAPI, HTTPException, Header, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
@@ -31,82 +36,137 @@ log = logging.getLogger(__name__)
 # Addon data dir (mapped volume)
 DATA_DIR = Path(os.environ.get("DATA_DIR", "/data"))
 WORKSPACE = DATA_DIR / "workspace"
+# Per-job YAML is tiny and short-lived: keep it in tmpfs (RAM) when available so no disk write per job
+SHM_DIR = Path("/dev/shm")
+CONFIG_DIR = SHM_DIR / "esphomecli" if SHM_DIR.is_dir() else WORKSPACE
+# esphome puts .esphome (build cache) next to the config by default; pin it to the persistent workspace
+ESPHOME_ENV = {**os.environ, "ESPHOME_DATA_DIR": os.environ.get("ESPHOME_DATA_DIR", str(WORKSPACE / ".esphome"))}
 OPTIONS_PATH = DATA_DIR / "options.json"
 
-# In-memory job store: job_id -> { type, status, logs, result, error, created_at }
+# In-memory job store: job_id -> { type, status, logs, result, error, created_at, finished_at }
+# Only touched from the event loop (jobs are asyncio tasks), so no lock is needed
+# logs is a deque of output lines (stdout+stderr merged), capped to the last JOB_LOG_MAX_LINES
 jobs: dict[str, dict[str, Any]] = {}
-jobs_lock = threading.Lock()
+# Per-job log cap (lines); older output is dropped so long compiles stay bounded in memory
+JOB_LOG_MAX_LINES = 5000
+# Lines of output kept in "error" when a job fails
+JOB_ERROR_TAIL_LINES = 20
+# Max bytes per output line read from esphome (asyncio default 64 KiB is too small for some tool output)
+STREAM_LINE_LIMIT = 1024 * 1024
+# How long to wait for output EOF after esphome exits before killing leftover children
+READER_GRACE_SECONDS = 5
+# How often to check whether esphome has exited
+EXIT_POLL_SECONDS = 0.2
+# Running job tasks (strong refs; asyncio only keeps weak refs to tasks)
+job_tasks: set[asyncio.Task] = set()
+
+# Finished jobs (success/failed) are dropped from the store this many seconds after finished_at
+JOB_TTL_SECONDS = 1800
+JOB_REAP_INTERVAL = 60
+TERMINAL_STATUSES = frozenset(("success", "failed"))
+
+# Default max esphome processes at once (each compile can use GBs of RAM); extra jobs wait as "pending".
+# Overridden by the max_concurrent_jobs addon option.
+DEFAULT_MAX_JOB_CONCURRENCY = 2
+
+# UI (index.html) served by StaticFiles mounts at the end of this module
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Collapses runs of slashes (Ingress can send //)
+_DOUBLE_SLASH = re.compile(r"/{2,}")
+# Paths the Ingress panel loads the UI from, and the proxy headers logged for diagnostics
+_ROOT_PATHS = frozenset(("//", "/", ""))
+_INGRESS_HEADER_KEYS = (
+    "x-ingress-path",
+    "x-forwarded-for",
+    "x-forwarded-host",
+    "x-forwarded-proto",
+    "x-forwarded-uri",
+    "x-request-uri",
+    "x-original-uri",
+)
 
 # Allowed esphome subcommands (no arbitrary commands)
 ALLOWED_COMMANDS = {"config", "compile", "upload", "run", "clean"}
+# argv prefix per subcommand, and the subcommands that talk to a device (--device / --upload-speed)
+_PREFIX = {cmd: ("esphome", cmd) for cmd in ALLOWED_COMMANDS}
+_DEV_CMDS = frozenset(("upload", "run"))
+
+
+async def _reap_jobs() -> None:
+    """Periodically evict jobs finished more than JOB_TTL_SECONDS ago so the store (and /api/jobs) stays small."""
+    while True:
+        await asyncio.sleep(JOB_REAP_INTERVAL)
+        cutoff = monotonic() - JOB_TTL_SECONDS
+        expired = [
+            jid for jid, job in jobs.items()
+            if job["status"] in TERMINAL_STATUSES and job.get("finished_at", job["created_at"]) < cutoff
+        ]
+        for jid in expired:
+            del jobs[jid]
+        if expired:
+            log.info("Reaped %d finished job(s)", len(expired))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    log.info("ESPHome CLI addon starting; DATA_DIR=%s", DATA_DIR)
+    log.info("UI: static mount at / and /api/hassio_ingress (unknown GET paths serve index.html)")
+    # One client for Supervisor calls so the TCP connection is kept alive between token checks
+    app.state.http = httpx.AsyncClient(base_url="http://supervisor", timeout=5.0)
+    max_jobs = get_max_job_concurrency()
+    log.info("Max concurrent jobs: %d", max_jobs)
+    app.state.job_sem = asyncio.Semaphore(max_jobs)
+    reaper = asyncio.create_task(_reap_jobs())
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        await app.state.http.aclose()
 
-app = FastAPI(title="ESPHome CLI API", version="1.0.0")
-
-# Load UI HTML once so middleware can serve it for root/// (Ingress sends GET //)
-STATIC_DIR = Path(__file__).parent / "static"
-INDEX_HTML = (STATIC_DIR / "index.html").read_text(encoding="utf-8") if (STATIC_DIR / "index.html").exists() else "<!DOCTYPE html><html><body><h1>UI not found</h1></body></html>"
 
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (FastAPI's own ORJSONResponse is deprecated)."""
 
-@app.exception_handler(NotFound)
-async def custom_not_found(request: Request, exc: NotFound):
-    """If no route matched and path is root (e.g. GET // from Ingress), serve UI so panel loads."""
-    if request.method == "GET" and request.url.path in ("//", "/", ""):
-        log.info("NotFound fallback: serving UI for path %r", request.url.path)
-        return HTMLResponse(INDEX_HTML)
-    from starlette.responses import JSONResponse
-    return JSONResponse(status_code=404, content={"detail": "Not found"})
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
 
 
-@app.on_event("startup")
-async def startup():
-    log.info("ESPHome CLI addon starting; DATA_DIR=%s", DATA_DIR)
-    log.info("UI routes: GET / , GET /api/hassio_ingress/{path} , GET /{path} (catch-all)")
+# orjson for all JSON responses: the UI polls /api/jobs and /api/jobs/{id} continuously
+app = FastAPI(
+    title="ESPHome CLI API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
 @app.middleware("http")
 async def normalize_path_and_log(request: Request, call_next):
-    """Normalize path (e.g. // -> /) and log. Ingress can send // which 404s otherwise."""
+    """Normalize path (e.g. // -> /) and log. Ingress can send // which would miss the UI mount otherwise."""
     method = request.method
     raw_path = request.url.path
-    scope_path = request.scope.get("path", "<missing>")
-    is_root = method == "GET" and raw_path in ("//", "/", "")
-    # Log every request so we can see what actually reaches the app (path repr, bytes, scope)
-    log.info(
-        "DIAG %s raw_path=%r (len=%d) scope_path=%r is_root=%s",
-        method, raw_path, len(raw_path), scope_path, is_root,
-    )
-    if is_root:
-        log.info("Serving UI for root (raw_path=%r)", raw_path)
-        return HTMLResponse(INDEX_HTML)
-    path = raw_path
-    while "//" in path:
-        path = path.replace("//", "/")
+    debug = log.isEnabledFor(logging.DEBUG)
+    # Per-request diagnostics (path repr, scope, ingress headers) only at DEBUG; this runs for every static GET
+    if debug:
+        is_root = method == "GET" and raw_path in _ROOT_PATHS
+        log.debug(
+            "DIAG %s raw_path=%r (len=%d) scope_path=%r is_root=%s",
+            method, raw_path, len(raw_path), request.scope.get("path", "<missing>"), is_root,
+        )
+    path = _DOUBLE_SLASH.sub("/", raw_path)
     if path != raw_path:
         request.scope["path"] = path
         request.scope["raw_path"] = path.encode("utf-8")
-    path = request.scope["path"]
-    headers = dict(request.headers)
-    ingress_related = {
-        k: headers.get(k)
-        for k in (
-            "x-ingress-path",
-            "x-forwarded-for",
-            "x-forwarded-host",
-            "x-forwarded-proto",
-            "x-forwarded-uri",
-            "x-request-uri",
-            "x-original-uri",
-        )
-        if headers.get(k)
-    }
-    log.info("Request: %s %s | ingress-related: %s", method, path, ingress_related or "none")
-    try:
-        response = await call_next(request)
-        log.info("Response: %s %s -> %s", method, path, response.status_code)
-        return response
-    except Exception as e:
-        log.exception("Request failed: %s %s -> %s", method, path, e)
-        raise
+    if debug:
+        headers = request.headers
+        ingress_related = {k: headers[k] for k in _INGRESS_HEADER_KEYS if headers.get(k)}
+        log.debug("Request: %s %s | ingress-related: %s", method, path, ingress_related or "none")
+    # Unhandled errors propagate to Starlette's ServerErrorMiddleware, which logs the traceback
+    response = await call_next(request)
+    if debug:
+        log.debug("Response: %s %s -> %s", method, path, response.status_code)
+    return response
 
 
 # --- Options (addon config) ---
@@ -119,36 +179,42 @@ def get_options() -> dict:
         return {}
 
 
+def get_max_job_concurrency() -> int:
+    """max_concurrent_jobs from addon options; invalid or missing -> default, never below 1."""
+    value = get_options().get("max_concurrent_jobs", DEFAULT_MAX_JOB_CONCURRENCY)
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        log.warning("Invalid max_concurrent_jobs %r; using %d", value, DEFAULT_MAX_JOB_CONCURRENCY)
+        return DEFAULT_MAX_JOB_CONCURRENCY
+    return max(1, n)
+
+
 # --- Auth: validate Bearer token with HA (when auth_api enabled) ---
-async def verify_ha_token(authorization: Optional[str] = Header(None)) -> bool:
+async def verify_ha_token(request: Request, authorization: Optional[str] = Header(None)) -> bool:
     """If addon has auth_api, we can validate token via Supervisor. For Ingress, HA already authenticated."""
     # Ingress requests come with session; direct API calls may send Bearer token.
     if not authorization or not authorization.startswith("Bearer "):
         return False
-    token = authorization.replace("Bearer ", "").strip()
+    token = authorization[len("Bearer "):].strip()
     if not token:
         return False
-    # Call Supervisor proxy to HA: GET /api/ with Authorization
-    import urllib.request
-    req = urllib.request.Request(
-        "http://supervisor/core/api/",
-        headers={"Authorization": f"Bearer {token}"},
-    )
+    # Call Supervisor proxy to HA: GET /api/ with Authorization (shared async client, no event-loop block)
     try:
-        with urllib.request.urlopen(req, timeout=5) as r:
-            return r.status == 200
+        r = await request.app.state.http.get("/core/api/", headers={"Authorization": f"Bearer {token}"})
+        return r.status_code == 200
     except Exception:
         return False
 
 
 async def optional_auth(request: Request, authorization: Optional[str] = Header(None)) -> None:
     """Allow request if: from Ingress (has X-Ingress-Path or trusted), or Bearer valid."""
-    # When loaded via Ingress, request is already authenticated by HA
-    if request.headers.get("X-Ingress-Path") or request.headers.get("X-Hass-Source"):
+    # When loaded via Ingress, request is already authenticated by HA (no Supervisor call needed)
+    h = request.headers
+    if "x-ingress-path" in h or "x-hass-source" in h:
+        return
+    if await verify_ha_token(request, authorization):
         return
-    if authorization and authorization.startswith("Bearer "):
-        if await verify_ha_token(authorization):
-            return
     # Allow unauthenticated for health and for simpler local use; tighten in production
     # raise HTTPException(status_code=401, detail="Not authorized")
     return
@@ -195,8 +261,9 @@ def ensure_workspace() -> Path:
 
 
 def write_temp_yaml(content: str, job_id: str) -> Path:
-    ws = ensure_workspace()
-    path = ws / f"config_{job_id}.yaml"
+    ensure_workspace()
+    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    path = CONFIG_DIR / f"config_{job_id}.yaml"
     path.write_text(content, encoding="utf-8")
     return path
 
@@ -213,86 +280,153 @@ def build_esphome_args(
 ) -> list[str]:
     if subcommand not in ALLOWED_COMMANDS:
         raise ValueError(f"Command not allowed: {subcommand}")
-    args = ["esphome", subcommand, str(config_path)]
+    args = [*_PREFIX[subcommand], str(config_path)]
     if subcommand == "compile" and only_generate:
         args.append("--only-generate")
-    if device and subcommand in ("upload", "run"):
-        args.extend(["--device", device])
-    if upload_speed and subcommand in ("upload", "run"):
-        args.extend(["--upload-speed", str(upload_speed)])
-    if no_logs and subcommand == "run":
-        args.append("--no-logs")
+    if subcommand in _DEV_CMDS:
+        if device:
+            args += ("--device", device)
+        if upload_speed:
+            args += ("--upload-speed", str(upload_speed))
+        if no_logs and subcommand == "run":
+            args.append("--no-logs")
     if substitutions:
-        for k, v in substitutions.items():
-            args.extend(["--substitution", k, str(v)])
+        args += (x for k, v in substitutions.items() for x in ("--substitution", k, str(v)))
     return args
 
 
-def run_esphome_sync(args: list[str], job_id: str) -> tuple[int, str, str]:
-    """Run esphome, capture stdout/stderr, update job logs. Returns (returncode, stdout, stderr)."""
-    config_path = Path(args[-1])
-    cwd = str(config_path.parent) if config_path.is_file() else str(WORKSPACE)
-    with jobs_lock:
-        if job_id in jobs:
-            jobs[job_id]["status"] = "running"
+async def _pump_lines(stream: asyncio.StreamReader, logs: deque) -> None:
+    """Append decoded lines from the process output to the job's log buffer as they arrive."""
+    async for line in stream:
+        logs.append(line.decode("utf-8", errors="replace"))
+
+
+def _signal_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    """Send sig to the job's whole process group (esphome and everything it spawned)."""
     try:
-        proc = subprocess.run(
-            args,
-            capture_output=True,
-            text=True,
-            timeout=600,
-            cwd=cwd,
-        )
-        stdout, stderr = proc.stdout or "", proc.stderr or ""
-        with jobs_lock:
-            if job_id in jobs:
-                jobs[job_id]["logs"] = (jobs[job_id].get("logs") or "") + stdout + stderr
-                jobs[job_id]["status"] = "success" if proc.returncode == 0 else "failed"
-                jobs[job_id]["returncode"] = proc.returncode
-                if proc.returncode != 0:
-                    jobs[job_id]["error"] = stderr or stdout or f"Exit code {proc.returncode}"
-        return proc.returncode, stdout, stderr
-    except subprocess.TimeoutExpired:
-        with jobs_lock:
-            if job_id in jobs:
-                jobs[job_id]["status"] = "failed"
-                jobs[job_id]["error"] = "Command timed out (600s)"
-        return -1, "", "Timeout"
-    except Exception as e:
-        with jobs_lock:
-            if job_id in jobs:
-                jobs[job_id]["status"] = "failed"
-                jobs[job_id]["error"] = str(e)
-        raise
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
 
 
-def run_job(job_id: str, job_type: str, args: list[str], config_path: Path) -> None:
-    """Background thread target: run esphome and optionally delete temp file."""
+async def _wait_exit(proc: asyncio.subprocess.Process) -> None:
+    """Wait until esphome itself has exited.
+
+    Process.wait() only resolves once the stdout pipe reaches EOF, which never happens while a
+    child esphome spawned still holds it; returncode is set on exit regardless, so poll that.
+    """
+    while proc.returncode is None:
+        await asyncio.sleep(EXIT_POLL_SECONDS)
+
+
+async def _finish_reader(proc: asyncio.subprocess.Process, reader: asyncio.Task) -> None:
+    """Wait for output EOF once esphome has exited; leftover children holding the pipe are killed."""
+    try:
+        await asyncio.wait_for(asyncio.shield(reader), timeout=READER_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _signal_group(proc, signal.SIGKILL)
+        try:
+            await asyncio.wait_for(reader, timeout=READER_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _run_job_async(job_id: str, args: list[str], config_path: Path) -> None:
+    """Background task: wait for a pool slot, run esphome streaming its output, then delete temp file."""
     try:
-        run_esphome_sync(args, job_id)
+        async with app.state.job_sem:
+            if job_id not in jobs:
+                return
+            jobs[job_id]["status"] = "running"
+            logs = jobs[job_id]["logs"]
+            # Own process group so a timeout also stops platformio/scons/gcc spawned by esphome
+            proc = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                cwd=str(WORKSPACE),
+                env=ESPHOME_ENV,
+                limit=STREAM_LINE_LIMIT,
+                start_new_session=True,
+            )
+            reader = asyncio.create_task(_pump_lines(proc.stdout, logs))
+            try:
+                await asyncio.wait_for(_wait_exit(proc), timeout=600)
+            except asyncio.TimeoutError:
+                if proc.returncode is None:
+                    _signal_group(proc, signal.SIGTERM)
+                    try:
+                        await asyncio.wait_for(_wait_exit(proc), timeout=10)
+                    except asyncio.TimeoutError:
+                        _signal_group(proc, signal.SIGKILL)
+                        await _wait_exit(proc)
+                    await _finish_reader(proc, reader)
+                    jobs[job_id]["status"] = "failed"
+                    jobs[job_id]["error"] = "Command timed out (600s)"
+                    return
+            await _finish_reader(proc, reader)
+            jobs[job_id]["status"] = "success" if proc.returncode == 0 else "failed"
+            jobs[job_id]["returncode"] = proc.returncode
+            if proc.returncode != 0:
+                # Last lines of output carry esphome's failure reason (stdout/stderr are merged)
+                tail = "".join(list(logs)[-JOB_ERROR_TAIL_LINES:]).strip()
+                jobs[job_id]["error"] = tail or f"Exit code {proc.returncode}"
+    except Exception as e:
+        log.exception("Job %s failed", job_id)
+        if job_id in jobs:
+            jobs[job_id]["status"] = "failed"
+            jobs[job_id]["error"] = str(e)
     finally:
+        # Reaper expiry counts from here, not from created_at (a job may have queued for a while)
+        if job_id in jobs and jobs[job_id]["status"] in TERMINAL_STATUSES:
+            jobs[job_id]["finished_at"] = monotonic()
         try:
             config_path.unlink(missing_ok=True)
         except Exception:
             pass
 
 
+def new_job(job_id: str, job_type: str) -> None:
+    """Register a pending job; logs is a bounded deque of lines, joined only when the job is fetched."""
+    jobs[job_id] = {
+        "type": job_type,
+        "status": "pending",
+        "logs": deque(maxlen=JOB_LOG_MAX_LINES),
+        "error": None,
+        "created_at": monotonic(),
+    }
+
+
+def start_job(job_id: str, args: list[str], config_path: Path) -> None:
+    """Schedule a job on the event loop; keep a reference so the task isn't garbage-collected."""
+    task = asyncio.create_task(_run_job_async(job_id, args, config_path))
+    job_tasks.add(task)
+    task.add_done_callback(job_tasks.discard)
+
+
 # --- Sync validate (quick) ---
 @app.post("/api/validate")
 async def api_validate(body: ValidateRequest):
-    """Validate pasted YAML (synchronous). Returns validation result."""
-    job_id = str(uuid.uuid4())
+    """Validate pasted YAML (waits for result, non-blocking). Returns validation result."""
+    job_id = token_hex(16)
     config_path = write_temp_yaml(body.yaml, job_id)
     try:
         args = build_esphome_args("config", config_path)
-        proc = subprocess.run(
-            args,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=str(config_path.parent),
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=str(WORKSPACE),
+            env=ESPHOME_ENV,
         )
-        stdout, stderr = (proc.stdout or ""), (proc.stderr or "")
+        try:
+            stdout_b, stderr_b = await asyncio.wait_for(proc.communicate(), timeout=120)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        stdout = stdout_b.decode("utf-8", errors="replace")
+        stderr = stderr_b.decode("utf-8", errors="replace")
         config_path.unlink(missing_ok=True)
         if proc.returncode != 0:
             return {
@@ -302,7 +436,7 @@ async def api_validate(body: ValidateRequest):
                 "stderr": stderr,
             }
         return {"valid": True, "stdout": stdout, "stderr": stderr}
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         config_path.unlink(missing_ok=True)
         raise HTTPException(status_code=408, detail="Validation timed out")
     except Exception as e:
@@ -313,7 +447,7 @@ async def api_validate(body: ValidateRequest):
 # --- Async job endpoints ---
 @app.post("/api/compile")
 async def api_compile(body: CompileRequest):
-    job_id = str(uuid.uuid4())
+    job_id = token_hex(16)
     config_path = write_temp_yaml(body.yaml, job_id)
     args = build_esphome_args(
         "compile",
@@ -321,21 +455,14 @@ async def api_compile(body: CompileRequest):
         only_generate=body.only_generate,
         substitutions=body.substitutions,
     )
-    with jobs_lock:
-        jobs[job_id] = {
-            "type": "compile",
-            "status": "pending",
-            "logs": "",
-            "error": None,
-            "created_at": asyncio.get_event_loop().time(),
-        }
-    threading.Thread(target=run_job, args=(job_id, "compile", args, config_path), daemon=True).start()
+    new_job(job_id, "compile")
+    start_job(job_id, args, config_path)
     return {"job_id": job_id}
 
 
 @app.post("/api/upload")
 async def api_upload(body: UploadRequest):
-    job_id = str(uuid.uuid4())
+    job_id = token_hex(16)
     config_path = write_temp_yaml(body.yaml, job_id)
     args = build_esphome_args(
         "upload",
@@ -344,21 +471,14 @@ async def api_upload(body: UploadRequest):
         upload_speed=body.upload_speed,
         substitutions=body.substitutions,
     )
-    with jobs_lock:
-        jobs[job_id] = {
-            "type": "upload",
-            "status": "pending",
-            "logs": "",
-            "error": None,
-            "created_at": asyncio.get_event_loop().time(),
-        }
-    threading.Thread(target=run_job, args=(job_id, "upload", args, config_path), daemon=True).start()
+    new_job(job_id, "upload")
+    start_job(job_id, args, config_path)
     return {"job_id": job_id}
 
 
 @app.post("/api/run")
 async def api_run(body: RunRequest):
-    job_id = str(uuid.uuid4())
+    job_id = token_hex(16)
     config_path = write_temp_yaml(body.yaml, job_id)
     args = build_esphome_args(
         "run",
@@ -368,47 +488,32 @@ async def api_run(body: RunRequest):
         no_logs=body.no_logs,
         substitutions=body.substitutions,
     )
-    with jobs_lock:
-        jobs[job_id] = {
-            "type": "run",
-            "status": "pending",
-            "logs": "",
-            "error": None,
-            "created_at": asyncio.get_event_loop().time(),
-        }
-    threading.Thread(target=run_job, args=(job_id, "run", args, config_path), daemon=True).start()
+    new_job(job_id, "run")
+    start_job(job_id, args, config_path)
     return {"job_id": job_id}
 
 
 @app.post("/api/clean")
 async def api_clean(body: CleanRequest):
-    job_id = str(uuid.uuid4())
+    job_id = token_hex(16)
     config_path = write_temp_yaml(body.yaml, job_id)
     args = build_esphome_args("clean", config_path)
-    with jobs_lock:
-        jobs[job_id] = {
-            "type": "clean",
-            "status": "pending",
-            "logs": "",
-            "error": None,
-            "created_at": asyncio.get_event_loop().time(),
-        }
-    threading.Thread(target=run_job, args=(job_id, "clean", args, config_path), daemon=True).start()
+    new_job(job_id, "clean")
+    start_job(job_id, args, config_path)
     return {"job_id": job_id}
 
 
 @app.get("/api/jobs")
 async def api_list_jobs():
-    with jobs_lock:
-        return {"jobs": [{"job_id": jid, **{k: v for k, v in data.items() if k != "logs"}} for jid, data in list(jobs.items())]}
+    return {"jobs": [{"job_id": jid, **{k: v for k, v in data.items() if k != "logs"}} for jid, data in jobs.items()]}
 
 
 @app.get("/api/jobs/{job_id}")
 async def api_get_job(job_id: str):
-    with jobs_lock:
-        if job_id not in jobs:
-            raise HTTPException(status_code=404, detail="Job not found")
-        return jobs[job_id]
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = jobs[job_id]
+    return {**job, "logs": "".join(job["logs"])}
 
 
 @app.get("/api/health")
@@ -417,34 +522,21 @@ async def api_health():
 
 
 # --- Serve UI (Ingress) ---
-# STATIC_DIR and INDEX_HTML defined at top for middleware root/ // handling
-if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
-
-
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    log.info("Serving UI at /")
-    return HTMLResponse(INDEX_HTML)
+class UIStaticFiles(StaticFiles):
+    """StaticFiles that falls back to index.html for unknown paths, so any GET under the UI loads the panel."""
 
-
-# Ingress often sends GET // (double slash); FastAPI matches path exactly so add explicit route
-@app.get("//", response_class=HTMLResponse)
-async def root_double_slash():
-    log.info("Serving UI at //")
-    return HTMLResponse(INDEX_HTML)
-
-
-@app.get("/api/hassio_ingress/{rest:path}", response_class=HTMLResponse)
-async def ingress_ui(rest: str):
-    """Serve UI when request comes through Ingress (path prefix from Supervisor)."""
-    log.info("Serving UI at /api/hassio_ingress/%s", rest)
-    return HTMLResponse(INDEX_HTML)
+    async def get_response(self, path: str, scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            return await super().get_response("index.html", scope)
 
 
-# Catch-all for any other GET (log and serve UI so we can see what path was requested)
-@app.api_route("/{full_path:path}", methods=["GET"], response_class=HTMLResponse)
-async def catch_all_ui(request: Request, full_path: str):
-    """Serve UI for any unhandled GET (helps diagnose 404s)."""
-    log.warning("Catch-all GET for path: %r (full_path=%r) - serving UI", request.url.path, full_path)
-    return HTMLResponse(INDEX_HTML)
+# Mounted last so API routes above take precedence. html=True serves index.html for / (and // after
+# middleware normalization); StaticFiles adds ETag/Last-Modified so the browser can revalidate with 304.
+if STATIC_DIR.exists():
+    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/api/hassio_ingress", UIStaticFiles(directory=str(STATIC_DIR), html=True), name="ingress_ui")
+    app.mount("/", UIStaticFiles(directory=str(STATIC_DIR), html=True), name="ui")
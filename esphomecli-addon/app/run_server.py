@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
 """
-Find an available port and start uvicorn. Avoids conflict with esphome-hassio base image services.
-Tries: 1) Supervisor API (when ingress_port is 0), 2) free port in range 9080-9099.
+Find an available port and start uvicorn (in-process, uvloop + httptools). Avoids conflict with esphome-hassio base image services.
+Tries: 1) Supervisor API (when ingress_port is 0), 2) free port in range 9080-9099, 3) any free port (bind to 0).
 """
 import os
 import socket
-import sys
 import urllib.request
 
 # Port range to try (avoid 6052, 8099, 8098 used by base image)
@@ -32,29 +31,46 @@ def get_port_from_supervisor() -> int | None:
     return None
 
 
+def _bind_probe(port: int) -> int:
+    """Bind to port (0 = kernel picks) and return the bound port; raises OSError if unavailable."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Same options uvicorn binds with (SO_REUSEADDR only), so a free probe means uvicorn can bind too
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("0.0.0.0", port))
+        return s.getsockname()[1]
+
+
 def find_free_port() -> int:
+    # Prefer the fixed range (9080 is the port exposed in config.yaml); stop at the first port that binds
     for port in PORT_RANGE:
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                s.bind(("0.0.0.0", port))
-                return port
+            return _bind_probe(port)
         except OSError:
             continue
-    raise RuntimeError(f"No free port in range {PORT_RANGE.start}-{PORT_RANGE.stop - 1}")
+    # Range exhausted: let the kernel pick any free port in one bind instead of failing
+    try:
+        return _bind_probe(0)
+    except OSError:
+        raise RuntimeError(f"No free port in range {PORT_RANGE.start}-{PORT_RANGE.stop - 1}")
 
 
 def main():
     port = get_port_from_supervisor()
     if port is None:
         port = find_free_port()
-        print(f"No Supervisor port; using first free port: {port}", flush=True)
+        print(f"No Supervisor port; using free port: {port}", flush=True)
     else:
         print(f"Using Supervisor-assigned port: {port}", flush=True)
-    os.execve(
-        sys.executable,
-        [sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", str(port)],
-        os.environ,
+    # Run in this process (no second interpreter start). uvloop + httptools for faster request handling;
+    # access log off since normalize_path_and_log already logs requests (at DEBUG)
+    import uvicorn
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
     )
 
 